@@ -8,42 +8,61 @@ import hyperparameter_presets
 from experiment_base import ExperimentRunner, ShuffleNetExperimentRunner, MNISTExperimentRunner, \
     Conv2NetExperimentRunner
 from networks import FullyConnectedMNIST, ShuffleNet, Conv2Net
-from utils import apply_mask_dict_to_weight_dict
+from utils import apply_mask_dict_to_weight_dict, TensorDataLoader
 
 
 def mnist_experiment():
+    # Allow TF32 tensor cores for any float32 matmuls that aren't already running under autocast (Ampere and newer)
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
+    # The input shapes never change, so let cuDNN benchmark and cache the fastest algorithms
+    torch.backends.cudnn.benchmark = True
+
     num_classes = hyperparameter_presets.FULLY_CONNECTED_MNIST['num_classes']
     input_size = hyperparameter_presets.FULLY_CONNECTED_MNIST['input_size']
     hidden_sizes = hyperparameter_presets.FULLY_CONNECTED_MNIST['hidden_sizes']
     batch_size = hyperparameter_presets.FULLY_CONNECTED_MNIST['batch_size']
     learning_rate = hyperparameter_presets.FULLY_CONNECTED_MNIST['learning_rate']
+    learning_rate_decay = hyperparameter_presets.FULLY_CONNECTED_MNIST['learning_rate_decay']
     num_epochs = hyperparameter_presets.FULLY_CONNECTED_MNIST['epochs']
     prune_percent = hyperparameter_presets.FULLY_CONNECTED_MNIST['prune_percent']
     pruning_iterations = hyperparameter_presets.FULLY_CONNECTED_MNIST['prune_iterations']
+    prune_2to4 = hyperparameter_presets.FULLY_CONNECTED_MNIST['prune_2to4']
+    quantize_pruned_test = hyperparameter_presets.FULLY_CONNECTED_MNIST['quantize_pruned_test']
 
     # Temporary parameters. Should probably move this to the hyper parameters file as well
     num_training = 55000
     num_validation = 5000
 
     # Prepare the dataset
-    to_tensor_transform = transforms.Compose([transforms.ToTensor()])
-    mnist_dataset = torchvision.datasets.MNIST(root='datasets/', train=True, download=True, transform=to_tensor_transform)
-    mnist_test_dataset = torchvision.datasets.MNIST(root='datasets/', train=False, transform=to_tensor_transform)
-    mask = list(range(num_training))
-    mnist_train_dataset = torch.utils.data.Subset(mnist_dataset, mask)
-    mask = list(range(num_training, num_training + num_validation))
-    mnist_val_dataset = torch.utils.data.Subset(mnist_dataset, mask)
+    # MNIST is small enough to keep entirely on the GPU. Scaling the raw uint8 images to [0, 1] is exactly what
+    # ToTensor does, and we flatten them once here instead of reshaping every batch
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    mnist_dataset = torchvision.datasets.MNIST(root='datasets/', train=True, download=True)
+    mnist_test_dataset = torchvision.datasets.MNIST(root='datasets/', train=False)
+    images = mnist_dataset.data.view(-1, input_size).float().div_(255).to(device)
+    labels = mnist_dataset.targets.to(device)
+    test_images = mnist_test_dataset.data.view(-1, input_size).float().div_(255).to(device)
+    test_labels = mnist_test_dataset.targets.to(device)
 
     # Load the dataset
-    mnist_train_loader = torch.utils.data.DataLoader(dataset=mnist_train_dataset, batch_size=batch_size, shuffle=True)
-    mnist_val_loader = torch.utils.data.DataLoader(dataset=mnist_val_dataset, batch_size=batch_size, shuffle=False)
-    mnist_test_loader = torch.utils.data.DataLoader(dataset=mnist_test_dataset, batch_size=batch_size, shuffle=False)
+    validation_end = num_training + num_validation
+    mnist_train_loader = TensorDataLoader(
+        images[:num_training], labels[:num_training], batch_size, shuffle=True, drop_last=True
+    )
+    mnist_val_loader = TensorDataLoader(
+        images[num_training:validation_end], labels[num_training:validation_end], batch_size
+    )
+    mnist_test_loader = TensorDataLoader(test_images, test_labels, batch_size)
 
     model = FullyConnectedMNIST(input_size, hidden_sizes, num_classes)
     if torch.cuda.is_available():
         model.cuda()
 
-    experiment = MNISTExperimentRunner(model, batch_size=batch_size, num_epochs=num_epochs, learning_rate=learning_rate)
+    experiment = MNISTExperimentRunner(
+        model, batch_size=batch_size, num_epochs=num_epochs, learning_rate=learning_rate,
+        learning_rate_decay=learning_rate_decay, prune_2to4=prune_2to4
+    )
 
     experiment.train(input_size, mnist_train_loader, mnist_val_loader)
     experiment.test(input_size, mnist_test_loader)
@@ -60,13 +79,13 @@ def mnist_experiment():
     # experiment.print_stats()
 
     for i in range(1, pruning_iterations):
-        initial_weights_after_mask = apply_mask_dict_to_weight_dict(mask_dict, experiment.model.initial_weights)
+        initial_weights_after_mask = apply_mask_dict_to_weight_dict(mask_dict, experiment._raw_model.initial_weights)
         new_model = FullyConnectedMNIST(input_size, hidden_sizes, num_classes, pre_init=initial_weights_after_mask, mask_dict=mask_dict)
         if torch.cuda.is_available():
             new_model.cuda()
         experiment.set_model(new_model)
         experiment.train(input_size, mnist_train_loader, mnist_val_loader)
-        experiment.test(input_size, mnist_test_loader)
+        experiment.test(input_size, mnist_test_loader, quantize=quantize_pruned_test)
         try:
             mask_dict = experiment.prune(mask_dict, prune_percent=prune_percent)
         except IndexError:
@@ -78,6 +97,9 @@ def mnist_experiment():
 
 
 def shufflenet_experiment():
+    # The input shapes never change, so let cuDNN benchmark and cache the fastest algorithms
+    torch.backends.cudnn.benchmark = True
+
     num_classes = hyperparameter_presets.SHUFFLENET['num_classes']
     input_size = hyperparameter_presets.SHUFFLENET['input_size']
     batch_size = hyperparameter_presets.SHUFFLENET['batch_size']
@@ -110,22 +132,26 @@ def shufflenet_experiment():
                                                 transform=test_transform
                                                 )
 
-    mask = list(range(num_training))
-    train_dataset = torch.utils.data.Subset(cifar_dataset, mask)
-    mask = list(range(num_training, num_training + num_validation))
-    val_dataset = torch.utils.data.Subset(cifar_dataset, mask)
+    # Subset accepts any sequence of indices, and a range doesn't need to materialize them
+    train_dataset = torch.utils.data.Subset(cifar_dataset, range(num_training))
+    val_dataset = torch.utils.data.Subset(cifar_dataset, range(num_training, num_training + num_validation))
 
+    # Decode and transform batches in persistent worker processes while the GPU works on the previous ones. Pinned
+    # memory lets the runners copy the batches to the GPU with non_blocking=True
+    loader_kwargs = dict(batch_size=batch_size, num_workers=4, pin_memory=torch.cuda.is_available(),
+                         persistent_workers=True, prefetch_factor=4)
     train_loader = torch.utils.data.DataLoader(dataset=train_dataset,
-                                               batch_size=batch_size,
-                                               shuffle=True)
+                                               shuffle=True,
+                                               drop_last=True,
+                                               **loader_kwargs)
 
     val_loader = torch.utils.data.DataLoader(dataset=val_dataset,
-                                             batch_size=batch_size,
-                                             shuffle=False)
+                                             shuffle=False,
+                                             **loader_kwargs)
 
     test_loader = torch.utils.data.DataLoader(dataset=test_dataset,
-                                              batch_size=batch_size,
-                                              shuffle=False)
+                                              shuffle=False,
+                                              **loader_kwargs)
     model = ShuffleNet(input_size, num_classes)
     if torch.cuda.is_available():
         model.cuda()
@@ -161,6 +187,9 @@ def shufflenet_experiment():
 
 
 def conv2_experiment():
+    # The input shapes never change, so let cuDNN benchmark and cache the fastest algorithms
+    torch.backends.cudnn.benchmark = True
+
     num_classes = hyperparameter_presets.CONV2['num_classes']
     input_size = hyperparameter_presets.CONV2['input_size']
     batch_size = hyperparameter_presets.CONV2['batch_size']
@@ -189,22 +218,26 @@ def conv2_experiment():
                                                 transform=test_transform
                                                 )
 
-    mask = list(range(num_training))
-    train_dataset = torch.utils.data.Subset(cifar_dataset, mask)
-    mask = list(range(num_training, num_training + num_validation))
-    val_dataset = torch.utils.data.Subset(cifar_dataset, mask)
+    # Subset accepts any sequence of indices, and a range doesn't need to materialize them
+    train_dataset = torch.utils.data.Subset(cifar_dataset, range(num_training))
+    val_dataset = torch.utils.data.Subset(cifar_dataset, range(num_training, num_training + num_validation))
 
+    # Decode and transform batches in persistent worker processes while the GPU works on the previous ones. Pinned
+    # memory lets the runners copy the batches to the GPU with non_blocking=True
+    loader_kwargs = dict(batch_size=batch_size, num_workers=4, pin_memory=torch.cuda.is_available(),
+                         persistent_workers=True, prefetch_factor=4)
     train_loader = torch.utils.data.DataLoader(dataset=train_dataset,
-                                               batch_size=batch_size,
-                                               shuffle=True)
+                                               shuffle=True,
+                                               drop_last=True,
+                                               **loader_kwargs)
 
     val_loader = torch.utils.data.DataLoader(dataset=val_dataset,
-                                             batch_size=batch_size,
-                                             shuffle=False)
+                                             shuffle=False,
+                                             **loader_kwargs)
 
     test_loader = torch.utils.data.DataLoader(dataset=test_dataset,
-                                              batch_size=batch_size,
-                                              shuffle=False)
+                                              shuffle=False,
+                                              **loader_kwargs)
     model = Conv2Net(input_size, num_classes)
     if torch.cuda.is_available():
         model.cuda()
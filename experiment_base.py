@@ -5,12 +5,16 @@ import json
 
 from tqdm import tqdm
 from torch import nn
+from torch._utils import _flatten_dense_tensors, _unflatten_dense_tensors
 
 import matplotlib.pyplot as plt
 
 # A helper class that takes a model and dataset, and runs the experiment on it.
 from networks import FullyConnectedMNIST, ShuffleNet, Conv2Net
-from utils import get_zero_count
+from utils import get_zero_count, get_flat_offsets
+
+# Stateless, so every runner (and every training run) can share the same instance
+criterion = nn.CrossEntropyLoss()
 
 
 class ExperimentRunner:
@@ -24,6 +28,12 @@ class ExperimentRunner:
     ZERO_PERCENTAGE_IN_MASKS = "zero_percentage_in_masks"
     PERCENTAGE_WEIGHT_MASKED = "percentage_weight_masked"
 
+    # Layers with more surviving weights than this get their pruning cutoff estimated from a random sample
+    PRUNE_CUTOFF_SAMPLE_SIZE = 16384
+    # One generator per device for drawing those samples, so that pruning never advances the global RNG that the
+    # shuffling and weight initialization of the next run depend on
+    prune_cutoff_generators = dict()
+
     def __init__(self, model, num_epochs=10, batch_size=200, learning_rate=5e-3, learning_rate_decay=0.95, reg=0.001):
         self.learning_rate = learning_rate
         self.reg = reg
@@ -33,11 +43,13 @@ class ExperimentRunner:
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.stats = []  # Should be an array of dicts
         self.set_model(model)
-        self.model = model  # redundant, I know
 
     def set_model(self, model):
         # The model associated with the experiment keeps changing as we iteratively prune.
+        # Subclasses may swap self.model for a wrapped (e.g. compiled) version. self._raw_model always points to the
+        # plain nn.Module so that parameter names, attributes and state dicts stay the same.
         self.model = model
+        self._raw_model = model
         self.stats.append(dict())  # For storing the stats related to the new model
 
         # TODO: Refactor so as to make this work for higher dimensional tensors
@@ -56,11 +68,6 @@ class ExperimentRunner:
         stat = self.stats[-1]
         stat[stat_name] = value
 
-    @staticmethod
-    def update_lr(optimizer, lr):
-        for param_group in optimizer.param_groups:
-            param_group['lr'] = lr
-
     def train(self, input_size, train_dataloader, validation_dataloader):
         # TODO: Must return the best validation accuracy (early stopping_
         # TODO: Must automatically update self.stats without the child class being aware of it
@@ -79,36 +86,85 @@ class ExperimentRunner:
 
     def get_initial_mask(self):
         mask_dict = dict()
-        for name, parameter in self.model.named_parameters():
+        for name, parameter in self._raw_model.named_parameters():
             if name.endswith('weight'):
                 mask_dict[name] = torch.ones(parameter.data.shape)
 
         return mask_dict
 
+    @staticmethod
+    def get_prune_cutoff_generator(device):
+        generator = ExperimentRunner.prune_cutoff_generators.get(device)
+        if generator is None:
+            generator = torch.Generator(device=device)
+            generator.manual_seed(0)
+            ExperimentRunner.prune_cutoff_generators[device] = generator
+
+        return generator
+
+    @staticmethod
+    def get_prune_cutoff(prune_percent, abs_data, mask):
+        # Weights whose magnitude is <= the returned cutoff should be pruned. `mask` is a bool tensor
+        selected = abs_data[mask]
+        if selected.numel() == 0:
+            # Nothing left to prune. The experiments catch this and stop pruning
+            raise IndexError("All the weights in the layer have already been pruned")
+
+        sample_size = ExperimentRunner.PRUNE_CUTOFF_SAMPLE_SIZE
+        if selected.numel() > sample_size:
+            # The quantile of a random sample (with replacement) is off by well under a percent at this sample size,
+            # and costs the same no matter how large the layer is
+            generator = ExperimentRunner.get_prune_cutoff_generator(selected.device)
+            indices = torch.randint(0, selected.numel(), (sample_size,), device=selected.device, generator=generator)
+            return torch.quantile(selected[indices], prune_percent)
+
+        # Small layers get the exact cutoff. kthvalue is a linear time selection, which is all we need to find it
+        k = max(1, int(round(prune_percent * selected.numel())))
+        return torch.kthvalue(selected, k).values
+
     @staticmethod
     def get_new_mask(prune_percent, data, current_mask):
         # Coincidentally, this works tensors of any dimensions - not just 2D matrices!
-        # I hate this if statement as much as you do. Currently there's no easy way to switch between CPU and GPU
-        if torch.cuda.is_available():
-            sorted_weights = torch.sort(torch.abs(torch.masked_select(data, current_mask.cuda().byte()))).values
-            cutoff_index = int(torch.tensor(prune_percent * len(sorted_weights)).round())
-            cutoff = sorted_weights[cutoff_index]
-            return torch.where(torch.abs(data) <= cutoff, torch.zeros(current_mask.shape, dtype=torch.float).cuda(),
-                               current_mask.cuda())
-        else:
-            sorted_weights = torch.sort(torch.abs(torch.masked_select(data, current_mask.byte()))).values
-            cutoff_index = int(torch.tensor(prune_percent * len(sorted_weights)).round())
-            cutoff = sorted_weights[cutoff_index]
-            return torch.where(torch.abs(data) <= cutoff, torch.zeros(current_mask.shape, dtype=torch.float),
-                               current_mask)
+        # Everything stays on the device `data` lives on - no sorting, no round trips through numpy
+        # copy=True so that we never update the caller's mask in place, even if it already is a bool tensor
+        mask = current_mask.to(data.device, dtype=torch.bool, copy=True)
+        abs_data = data.abs()
+        cutoff = ExperimentRunner.get_prune_cutoff(prune_percent, abs_data, mask)
+        # Both updates happen in place, so no other full size tensors get allocated
+        mask.logical_and_(abs_data.gt_(cutoff))
+        return mask.to(torch.uint8)
+
+    @staticmethod
+    def get_new_mask_2to4(data, current_mask):
+        # 2:4 structured sparsity - out of every 4 consecutive weights along the input dimension, keep the 2 with the
+        # largest magnitude. This is the pattern that the sparse tensor cores on Ampere (and newer) GPUs accelerate
+        if data.shape[-1] % 4 != 0:
+            raise ValueError("2:4 sparsity needs the input dimension to be a multiple of 4, got {}".format(data.shape))
+
+        groups = data.abs().reshape(-1, 4)
+        keep = groups.topk(2, dim=1).indices
+        mask = torch.zeros_like(groups, dtype=torch.bool).scatter_(1, keep, True).view(data.shape)
+        new_mask = mask & current_mask.to(data.device, dtype=torch.bool)
+        return new_mask.to(torch.uint8)
 
     def get_zero_count_in_weights(self):
         # In each linear layer in the network, count the number of zeros. Useful for debugging
-        zeros_info_dict = dict()
-
-        for name, param in self.model.named_parameters():
+        names = []
+        weights = []
+        for name, param in self._raw_model.named_parameters():
             if name.endswith('weight'):
-                zeros_info_dict[name] = get_zero_count(param.data)/param.data.numel()
+                names.append(name)
+                weights.append(param.data)
+
+        if not weights:
+            return dict()
+
+        # Keep the per layer counts on the device and bring them back to the host in a single transfer
+        zero_counts = torch.stack([(weight == 0).sum() for weight in weights]).tolist()
+
+        zeros_info_dict = dict()
+        for name, weight, zero_count in zip(names, weights, zero_counts):
+            zeros_info_dict[name] = zero_count/weight.numel()
 
         return zeros_info_dict
 
@@ -142,95 +198,101 @@ class ExperimentRunner:
 
 
 class MNISTExperimentRunner(ExperimentRunner):
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, prune_2to4=False, **kwargs):
+        self.prune_2to4 = prune_2to4
+        # Only Ampere (compute capability 8.x) and newer GPUs run bfloat16 matmuls on tensor cores. Older GPUs stay in
+        # float32 (TF32 doesn't exist there either), where bfloat16 would be emulated and slower
+        self.use_bfloat16 = torch.cuda.is_available() and torch.cuda.get_device_capability()[0] >= 8
         super(MNISTExperimentRunner, self).__init__(*args, **kwargs)
 
+    def set_model(self, model):
+        super(MNISTExperimentRunner, self).set_model(model)
+        # The network is tiny, so python dispatch and kernel launch overhead dominate the actual compute. Compiling
+        # fuses the Linear + ReLU chain and replays the whole thing as a CUDA graph. Triton is GPU only.
+        if self.device.type == 'cuda':
+            self.model = torch.compile(model, mode="reduce-overhead", fullgraph=False)
+
+    def autocast(self, enabled=True):
+        # Run the matmuls in bfloat16 on the GPU. bfloat16 has the same range as float32, so no GradScaler is needed
+        return torch.autocast(device_type='cuda', dtype=torch.bfloat16, enabled=enabled and self.use_bfloat16)
+
     def train(self, input_size, train_dataloader, validation_dataloader):
-        criterion = nn.CrossEntropyLoss()
-        optimizer = torch.optim.Adam(self.model.parameters(), lr=self.learning_rate, weight_decay=self.reg)
+        # On the GPU, the compiled model already replays forward + backward as CUDA graphs (see set_model). That leaves
+        # the optimizer step, which the fused Adam kernel does in a single launch
+        fused = self.device.type == 'cuda'
+        optimizer = torch.optim.Adam(
+            self.model.parameters(), lr=self.learning_rate, weight_decay=self.reg, foreach=not fused, fused=fused
+        )
+        # Compounds the decay every epoch: lr = learning_rate * learning_rate_decay ** epoch
+        scheduler = torch.optim.lr_scheduler.ExponentialLR(optimizer, gamma=self.learning_rate_decay)
 
         training_start_time = time.time()
         best_validation_accuracy_so_far = 0
         for epoch in tqdm(range(self.num_epochs)):
+            # The data loaders hand out flattened batches that are already on self.device
             for i, (images, labels) in enumerate(train_dataloader):
-                # Move tensors to the configured device
-                images = images.to(self.device)
-                labels = labels.to(self.device)
-                images = images.view(self.batch_size, input_size)
-                optimizer.zero_grad()
-                output = self.model(images)
-                loss = criterion(output, labels)
+                optimizer.zero_grad(set_to_none=True)
+                with self.autocast():
+                    output = self.model(images)
+                    loss = criterion(output, labels)
                 loss.backward()
                 optimizer.step()
 
             # print('Epoch [{}/{}], Loss: {:.4f}'.format(epoch + 1, self.num_epochs, loss.item()))
-            # lr = self.learning_rate * self.learning_rate_decay
-            # self.update_lr(optimizer, lr)
+            scheduler.step()
             validation_accuracy = self.validate(input_size, validation_dataloader)
             if validation_accuracy > best_validation_accuracy_so_far:
                 best_validation_accuracy_so_far = validation_accuracy
                 self.update_stat(self.BEST_VALIDATION_ACCURACY, best_validation_accuracy_so_far)
-                torch.save(self.model.state_dict(), 'temp.ckpt')
+                torch.save(self._raw_model.state_dict(), 'temp.ckpt')
 
         self.update_stat(self.TRAINING_DURATION_SECONDS, time.time() - training_start_time)
         self.update_stat(self.FINAL_VALIDATION_ACCURACY, validation_accuracy)
 
     def validate(self, input_size, validation_dataloader):
-        with torch.no_grad():
-            correct = 0
+        with torch.no_grad(), self.autocast():
+            # Keep the running count on the device so that we don't sync with the host after every batch
+            correct = torch.zeros((), dtype=torch.long, device=self.device)
             total = 0
             for images, labels in validation_dataloader:
-                images = images.to(self.device)
-                labels = labels.to(self.device)
-
-                images = images.view(self.batch_size, input_size)
-                scores = self.model.forward(images)
-
-                predicted = []
-
-                def get_class(x):
-                    return torch.argsort(x)[-1]
+                scores = self.model(images)
 
-                for i in range(0, len(scores)):
-                    predicted.append(get_class(scores[i]))
-
-                predicted = torch.stack(predicted)
+                predicted = scores.argmax(dim=1)
                 total += labels.size(0)
-                correct += (predicted == labels).sum().item()
-            validation_accuracy = 100 * correct / total
+                correct += (predicted == labels).sum()
+            validation_accuracy = 100 * correct.item() / total
             # print('Validation accuracy is: {} %'.format(validation_accuracy))
 
         return validation_accuracy
 
-    def test(self, input_size, test_dataloader):
-        best_model = FullyConnectedMNIST(self.model.input_size, self.model.hidden_sizes, self.model.num_classes)
+    def test(self, input_size, test_dataloader, quantize=False):
+        best_model = FullyConnectedMNIST(
+            self._raw_model.input_size, self._raw_model.hidden_sizes, self._raw_model.num_classes
+        )
         if torch.cuda.is_available():
             best_model.cuda()
         best_model.load_state_dict(torch.load('temp.ckpt'))
 
-        with torch.no_grad():
-            correct = 0
+        device = self.device
+        if quantize:
+            # Testing is pure inference, so the Linear layers can run with int8 weights (activations are quantized on
+            # the fly). The int8 kernels come from FBGEMM, which only runs on the CPU
+            best_model = torch.ao.quantization.quantize_dynamic(best_model.cpu(), {nn.Linear}, dtype=torch.qint8)
+            device = torch.device('cpu')
+            # Move the whole test set over once, rather than copying every batch back from the GPU
+            test_dataloader = test_dataloader.to(device)
+
+        with torch.no_grad(), self.autocast(enabled=not quantize):
+            correct = torch.zeros((), dtype=torch.long, device=device)
             total = 0
             for images, labels in test_dataloader:
-                images = images.to(self.device)
-                labels = labels.to(self.device)
+                scores = best_model(images)
 
-                images = images.view(self.batch_size, input_size)
-                scores = best_model.forward(images)
-
-                predicted = []
-
-                def get_class(x):
-                    return torch.argsort(x)[-1]
-
-                for i in range(0, len(scores)):
-                    predicted.append(get_class(scores[i]))
-
-                predicted = torch.stack(predicted)
+                predicted = scores.argmax(dim=1)
                 total += labels.size(0)
-                correct += (predicted == labels).sum().item()
+                correct += (predicted == labels).sum()
 
-            test_accuracy = 100 * correct / total
+            test_accuracy = 100 * correct.item() / total
             print('Test accuracy is: {} %'.format(test_accuracy))
             print('Best validation accuracy is: {} %'.format(self.get_stat(self.BEST_VALIDATION_ACCURACY)))
         self.update_stat(self.TEST_ACCURACY, test_accuracy)
@@ -239,7 +301,9 @@ class MNISTExperimentRunner(ExperimentRunner):
     def prune(self, mask_dict, prune_percent=0.1):
         # Use the best model obtained through early stopping. Weights are in the file temp.ckpt
         # TODO: Make this more elegant - do not hardcode the file name
-        best_model = FullyConnectedMNIST(self.model.input_size, self.model.hidden_sizes, self.model.num_classes)
+        best_model = FullyConnectedMNIST(
+            self._raw_model.input_size, self._raw_model.hidden_sizes, self._raw_model.num_classes
+        )
         if torch.cuda.is_available():
             best_model.cuda()
         best_model.load_state_dict(torch.load('temp.ckpt'))
@@ -247,17 +311,36 @@ class MNISTExperimentRunner(ExperimentRunner):
         # We assume that all layers are pruned by the same percentage
         # Yes, we prune per layer, not globally
 
+        names = []
+        weights = []
+        prune_percents = []
         for name, parameter in best_model.named_parameters():
             # TODO: Check if we should indeed ignore the bias
             if name.endswith('weight'):
-                current_mask = mask_dict.get(name, None)
-                if name == 'output_layer.weight':
-                    # Last layer always has a different prune rate
-                    # TODO: Since this is model specific, move the prune() method to the neural network class
-                    new_mask = self.get_new_mask(prune_percent/2, parameter.data, current_mask)
-                else:
-                    new_mask = self.get_new_mask(prune_percent, parameter.data, current_mask)
-                mask_dict[name] = new_mask
+                names.append(name)
+                weights.append(parameter.data)
+                # Last layer always has a different prune rate
+                # TODO: Since this is model specific, move the prune() method to the neural network class
+                prune_percents.append(prune_percent/2 if name == 'output_layer.weight' else prune_percent)
+
+        # Lay all the weights (and masks) out in one flat tensor. The cutoffs are still found per layer, and each
+        # layer's slice is thresholded in place against its own cutoff. The new masks for all the layers are then built
+        # with a single AND
+        flat_abs_weights = _flatten_dense_tensors(weights).abs()
+        device = flat_abs_weights.device
+        flat_mask = _flatten_dense_tensors([mask_dict[name].to(device, dtype=torch.bool) for name in names])
+        offsets = get_flat_offsets(weights)
+        for percent, start, end in zip(prune_percents, offsets[:-1], offsets[1:]):
+            cutoff = self.get_prune_cutoff(percent, flat_abs_weights[start:end], flat_mask[start:end])
+            flat_abs_weights[start:end].gt_(cutoff)
+        flat_mask.logical_and_(flat_abs_weights)
+
+        new_masks = _unflatten_dense_tensors(flat_mask.to(torch.uint8), weights)
+        for name, weight, new_mask in zip(names, weights, new_masks):
+            if self.prune_2to4 and name != 'output_layer.weight':
+                # The hidden layers are the big GEMMs, so that's where 2:4 sparsity pays off
+                new_mask = self.get_new_mask_2to4(weight, new_mask)
+            mask_dict[name] = new_mask
 
         self.update_stat(self.ZERO_PERCENTAGE_IN_MASKS, self.get_zero_count_in_mask(mask_dict))
         return mask_dict
@@ -279,8 +362,9 @@ class ShuffleNetExperimentRunner(ExperimentRunner):
         return mask_dict
 
     def train(self, input_size, train_dataloader, validation_dataloader):
-        criterion = nn.CrossEntropyLoss()
-        optimizer = torch.optim.Adam(self.model.parameters(), lr=self.learning_rate, weight_decay=self.reg)
+        optimizer = torch.optim.Adam(
+            self.model.parameters(), lr=self.learning_rate, weight_decay=self.reg, foreach=True
+        )
         scheduler = torch.optim.lr_scheduler.StepLR(optimizer, step_size=self.lr_step_size, gamma=self.lr_step_gamma)
 
         training_start_time = time.time()
@@ -289,8 +373,8 @@ class ShuffleNetExperimentRunner(ExperimentRunner):
         for epoch in tqdm(range(self.num_epochs)):
             for i, (images, labels) in enumerate(train_dataloader):
                 # Move tensors to the configured device
-                images = images.to(self.device)
-                labels = labels.to(self.device)
+                images = images.to(self.device, non_blocking=True)
+                labels = labels.to(self.device, non_blocking=True)
                 optimizer.zero_grad()
                 output = self.model(images)
                 loss = criterion(output, labels)
@@ -315,26 +399,18 @@ class ShuffleNetExperimentRunner(ExperimentRunner):
 
     def validate(self, input_size, validation_dataloader):
         with torch.no_grad():
-            correct = 0
+            correct = torch.zeros((), dtype=torch.long, device=self.device)
             total = 0
             for images, labels in validation_dataloader:
-                images = images.to(self.device)
-                labels = labels.to(self.device)
-
-                scores = self.model.forward(images)
-
-                predicted = []
+                images = images.to(self.device, non_blocking=True)
+                labels = labels.to(self.device, non_blocking=True)
 
-                def get_class(x):
-                    return torch.argsort(x)[-1]
+                scores = self.model(images)
 
-                for i in range(0, len(scores)):
-                    predicted.append(get_class(scores[i]))
-
-                predicted = torch.stack(predicted)
+                predicted = scores.argmax(dim=1)
                 total += labels.size(0)
-                correct += (predicted == labels).sum().item()
-            validation_accuracy = 100 * correct / total
+                correct += (predicted == labels).sum()
+            validation_accuracy = 100 * correct.item() / total
 
         return validation_accuracy
 
@@ -345,27 +421,19 @@ class ShuffleNetExperimentRunner(ExperimentRunner):
         best_model.load_state_dict(torch.load('temp.ckpt'))
 
         with torch.no_grad():
-            correct = 0
+            correct = torch.zeros((), dtype=torch.long, device=self.device)
             total = 0
             for images, labels in test_dataloader:
-                images = images.to(self.device)
-                labels = labels.to(self.device)
-
-                scores = best_model.forward(images)
-
-                predicted = []
+                images = images.to(self.device, non_blocking=True)
+                labels = labels.to(self.device, non_blocking=True)
 
-                def get_class(x):
-                    return torch.argsort(x)[-1]
+                scores = best_model(images)
 
-                for i in range(0, len(scores)):
-                    predicted.append(get_class(scores[i]))
-
-                predicted = torch.stack(predicted)
+                predicted = scores.argmax(dim=1)
                 total += labels.size(0)
-                correct += (predicted == labels).sum().item()
+                correct += (predicted == labels).sum()
 
-            test_accuracy = 100 * correct / total
+            test_accuracy = 100 * correct.item() / total
             print('Test accuracy is: {} %'.format(test_accuracy))
             print('Best validation accuracy is: {} %'.format(self.get_stat(self.BEST_VALIDATION_ACCURACY)))
         self.update_stat(self.TEST_ACCURACY, test_accuracy)
@@ -403,15 +471,16 @@ class Conv2NetExperimentRunner(ExperimentRunner):
         super(Conv2NetExperimentRunner, self).__init__(*args, **kwargs)
 
     def train(self, input_size, train_dataloader, validation_dataloader):
-        criterion = nn.CrossEntropyLoss()
-        optimizer = torch.optim.Adam(self.model.parameters(), lr=self.learning_rate, weight_decay=self.reg)
+        optimizer = torch.optim.Adam(
+            self.model.parameters(), lr=self.learning_rate, weight_decay=self.reg, foreach=True
+        )
         training_start_time = time.time()
         best_validation_accuracy_so_far = 0
         for epoch in tqdm(range(self.num_epochs)):
             for i, (images, labels) in enumerate(train_dataloader):
                 # Move tensors to the configured device
-                images = images.to(self.device)
-                labels = labels.to(self.device)
+                images = images.to(self.device, non_blocking=True)
+                labels = labels.to(self.device, non_blocking=True)
                 optimizer.zero_grad()
                 output = self.model(images)
                 loss = criterion(output, labels)
@@ -429,26 +498,18 @@ class Conv2NetExperimentRunner(ExperimentRunner):
 
     def validate(self, input_size, validation_dataloader):
         with torch.no_grad():
-            correct = 0
+            correct = torch.zeros((), dtype=torch.long, device=self.device)
             total = 0
             for images, labels in validation_dataloader:
-                images = images.to(self.device)
-                labels = labels.to(self.device)
-
-                scores = self.model.forward(images)
-
-                predicted = []
-
-                def get_class(x):
-                    return torch.argsort(x)[-1]
+                images = images.to(self.device, non_blocking=True)
+                labels = labels.to(self.device, non_blocking=True)
 
-                for i in range(0, len(scores)):
-                    predicted.append(get_class(scores[i]))
+                scores = self.model(images)
 
-                predicted = torch.stack(predicted)
+                predicted = scores.argmax(dim=1)
                 total += labels.size(0)
-                correct += (predicted == labels).sum().item()
-            validation_accuracy = 100 * correct / total
+                correct += (predicted == labels).sum()
+            validation_accuracy = 100 * correct.item() / total
 
         return validation_accuracy
 
@@ -459,27 +520,19 @@ class Conv2NetExperimentRunner(ExperimentRunner):
         best_model.load_state_dict(torch.load('temp.ckpt'))
 
         with torch.no_grad():
-            correct = 0
+            correct = torch.zeros((), dtype=torch.long, device=self.device)
             total = 0
             for images, labels in test_dataloader:
-                images = images.to(self.device)
-                labels = labels.to(self.device)
-
-                scores = best_model.forward(images)
-
-                predicted = []
-
-                def get_class(x):
-                    return torch.argsort(x)[-1]
+                images = images.to(self.device, non_blocking=True)
+                labels = labels.to(self.device, non_blocking=True)
 
-                for i in range(0, len(scores)):
-                    predicted.append(get_class(scores[i]))
+                scores = best_model(images)
 
-                predicted = torch.stack(predicted)
+                predicted = scores.argmax(dim=1)
                 total += labels.size(0)
-                correct += (predicted == labels).sum().item()
+                correct += (predicted == labels).sum()
 
-            test_accuracy = 100 * correct / total
+            test_accuracy = 100 * correct.item() / total
             print('Test accuracy is: {} %'.format(test_accuracy))
             print('Best validation accuracy is: {} %'.format(self.get_stat(self.BEST_VALIDATION_ACCURACY)))
         self.update_stat(self.TEST_ACCURACY, test_accuracy)
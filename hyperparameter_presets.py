@@ -6,9 +6,12 @@ FULLY_CONNECTED_MNIST = {
     'num_classes': 10,
     'batch_size': 100,
     'learning_rate': 0.0012,
+    'learning_rate_decay': 1.0,  # Per epoch multiplier for the learning rate. 1.0 keeps it constant
     'epochs': 100,
     'prune_percent': 0.2,
-    'prune_iterations': 40
+    'prune_iterations': 40,
+    'prune_2to4': False,  # Constrain the hidden layer masks to 2:4 structured sparsity
+    'quantize_pruned_test': False  # Test the pruned networks with int8 dynamic quantization on the CPU
 }
 
 SHUFFLENET = {
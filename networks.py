@@ -20,6 +20,18 @@ class NeuralNetUtilsMixin:
         return initial_weights
 
 
+class MaskedLinear(nn.Linear):
+    def __init__(self, in_features, out_features, mask, bias=True):
+        # A linear layer whose weight is multiplied by a fixed mask in the forward pass. Autograd takes care of zeroing
+        # the gradients of the masked weights, so there's no need to re-apply the mask to the weights every step
+        super(MaskedLinear, self).__init__(in_features, out_features, bias=bias)
+        # Not persistent, so that the state dict stays interchangeable with that of a plain nn.Linear
+        self.register_buffer('mask', mask.float(), persistent=False)
+
+    def forward(self, x):
+        return F.linear(x, self.weight * self.mask, self.bias)
+
+
 class LotteryExperimentNetwork(nn.Module, NeuralNetUtilsMixin):
     def __init__(self, pre_init=None, mask_dict=None):
         # pre_init and mask should both be dicts.
@@ -92,18 +104,29 @@ class FullyConnectedMNIST(LotteryExperimentNetwork):
         layer_sizes = [self.input_size] + self.hidden_sizes
 
         for i in range(0, len(layer_sizes) - 1):
-            layers.append(nn.Linear(layer_sizes[i], layer_sizes[i + 1]))
+            # The layers end up in an nn.Sequential called `layers`, hence the names
+            layers.append(self.create_linear('layers.{}'.format(len(layers)), layer_sizes[i], layer_sizes[i + 1]))
             layers.append(nn.ReLU())
 
-        self.output_layer = nn.Linear(layer_sizes[i+1], self.num_classes)
+        self.output_layer = self.create_linear('output_layer', layer_sizes[i+1], self.num_classes)
         layers.append(self.output_layer)
         self.output_relu = nn.ReLU()
         layers.append(self.output_relu)
 
         return nn.Sequential(*layers)
 
+    def create_linear(self, name, input_size, output_size):
+        mask = self.mask_dict.get(name + '.weight') if self.mask_dict else None
+        if mask is None:
+            return nn.Linear(input_size, output_size)
+        return MaskedLinear(input_size, output_size, mask)
+
+    def apply_mask_to_model(self, *args, **kwargs):
+        # Nothing to do - the MaskedLinear layers apply the masks as part of their forward pass
+        return
+
     def weights_init(self, m):
-        if type(m) == nn.Linear:
+        if isinstance(m, nn.Linear):
             m.weight.data.normal_(0.0, 1e-3)
             m.bias.data.fill_(0.)
 
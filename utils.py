@@ -6,6 +6,16 @@ def get_zero_count(matrix):
     return torch.sum(matrix == 0).item()
 
 
+def get_flat_offsets(tensors):
+    # Where each tensor starts (and the last one ends) when `tensors` are laid out back to back in one flat tensor,
+    # e.g. by torch._utils._flatten_dense_tensors. The i-th tensor is flat[offsets[i]:offsets[i + 1]]
+    offsets = [0]
+    for tensor in tensors:
+        offsets.append(offsets[-1] + tensor.numel())
+
+    return offsets
+
+
 def apply_mask_dict_to_weight_dict(mask_dict, weight_dict):
     # mask_dict - a dictionary where keys are layer names (string) and values are masks (bytetensor) for that layer
     # weight_dict - a dictionary where keys are layer names and values are weights (tensor) for that layer
@@ -21,3 +31,39 @@ def apply_mask_dict_to_weight_dict(mask_dict, weight_dict):
 
     return weights_after_masking
 
+
+class TensorDataLoader:
+    # A drop in replacement for torch.utils.data.DataLoader when the whole dataset already sits in memory (ideally
+    # the GPU) as two tensors. Batches are produced by indexing the tensors directly - no workers, no per-sample
+    # transforms and no collation
+    def __init__(self, images, labels, batch_size, shuffle=False, drop_last=False):
+        self.images = images
+        self.labels = labels
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        # Drop the last batch if it's smaller than batch_size, so that every batch has the same shape
+        self.drop_last = drop_last
+
+    def to(self, device):
+        # A loader over copies of the tensors on `device`
+        return TensorDataLoader(
+            self.images.to(device), self.labels.to(device), self.batch_size, shuffle=self.shuffle,
+            drop_last=self.drop_last
+        )
+
+    def __len__(self):
+        if self.drop_last:
+            return len(self.labels) // self.batch_size
+        return (len(self.labels) + self.batch_size - 1) // self.batch_size
+
+    def __iter__(self):
+        num_samples = len(self.labels)
+        if self.shuffle:
+            permutation = torch.randperm(num_samples, device=self.labels.device)
+
+        for start in range(0, len(self) * self.batch_size, self.batch_size):
+            if self.shuffle:
+                indices = permutation[start:start + self.batch_size]
+                yield self.images[indices], self.labels[indices]
+            else:
+                yield self.images[start:start + self.batch_size], self.labels[start:start + self.batch_size]